@@ -21,14 +21,19 @@
 #
 from __future__ import annotations
 
+import array
 import gzip
 import itertools
 import logging
 import multiprocessing
+import multiprocessing.pool
+import operator
 import os
 import signal
 import sys
 from typing import (
+    IO,
+    TYPE_CHECKING,
     Any,
     ClassVar,
     NamedTuple,
@@ -41,7 +46,18 @@ import rpy2.rinterface_lib.embedded
 
 from dbf_test.args import Args
 from dbf_test.formats import DistanceMatrix, read_name_mapping, read_vcf_samples
-from dbf_test.utils import IGzipFile, abort, open_rb, quote, require_file, setup_logging
+from dbf_test.utils import (
+    IGzipFile,
+    abort,
+    open_rb,
+    quote,
+    read_lines,
+    require_file,
+    setup_logging,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
 
 ########################################################################################
 # Logging
@@ -56,14 +72,6 @@ _warning = _LOG.warning
 # Analyses helper classes
 
 
-# Represents a sample in a VCF file
-class VCFSample(NamedTuple):
-    # Name as recorded in the VCF
-    name: str
-    # 0-based column in the VCF file (starting at 9)
-    column: int
-
-
 # Per-site statistics required to be in the input VCF
 class SiteInfo(NamedTuple):
     # Minor allele frequency
@@ -94,6 +102,77 @@ class DBFResults(TypedDict):
     P: float | None
 
 
+########################################################################################
+# VCF parsing
+
+
+def _find_info_value(
+    data: bytes,
+    key: bytes,
+    start: int = 0,
+    end: int | None = None,
+) -> bytes | None:
+    # Returns the value of the INFO field `key` (including the trailing `=`) found in
+    # the INFO column at `data[start:end]`. The column is scanned in-place, rather than
+    # being copied and/or split into every sub-field
+    if end is None:
+        end = len(data)
+
+    pos = data.find(key, start, end)
+    while pos > start and data[pos - 1] != 59:  # b";"
+        pos = data.find(key, pos + 1, end)
+
+    if pos < 0:
+        return None
+
+    pos += len(key)
+    value_end = data.find(b";", pos, end)
+
+    return data[pos:end] if value_end < 0 else data[pos:value_end]
+
+
+# Mapping of biallelic, diploid genotypes to the number of alternative alleles
+_GT_GROUPS = {
+    b"0|0": 0,
+    b"0|1": 1,
+    b"1|0": 1,
+    b"1|1": 2,
+    b"0/0": 0,
+    b"0/1": 1,
+    b"1/0": 1,
+    b"1/1": 2,
+}
+
+# Translation table mapping the alleles `0` and `1` to the bytes 0 and 1
+_ALLELES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _decode_gt_block(block: bytes) -> bytes | None:
+    # Decodes the tab-separated sample columns of a site with FORMAT=GT, where every
+    # column is expected to be a biallelic, diploid genotype such as `0/1` or `0|1`.
+    # Columns are thus exactly 4 bytes apart, so alleles can be extracted for all
+    # samples using strided slices. The allele bytes (0 or 1) are then summed for all
+    # samples at once by adding them as (big) integers, since no carries are possible.
+    # Returns None if the block does not match the expected layout
+    if (len(block) + 1) % 4:
+        return None
+
+    first = block[0::4]
+    second = block[2::4]
+    if (
+        first.translate(None, b"01")
+        or second.translate(None, b"01")
+        or block[1::4].translate(None, b"/|")
+        or block[3::4].translate(None, b"\t")
+    ):
+        return None
+
+    first_value = int.from_bytes(first.translate(_ALLELES), "big")
+    second_value = int.from_bytes(second.translate(_ALLELES), "big")
+
+    return (first_value + second_value).to_bytes(len(first), "big")
+
+
 ########################################################################################
 # Multiprocessing workers
 
@@ -102,35 +181,117 @@ class WorkerError(RuntimeError):
     pass
 
 
+# R function that runs `DBF.test` for multiple sites in a single call. Labels for each
+# site are stored as a column in an N x K matrix, with N samples and K sites, and the
+# statistic and p-value for each site are returned as the columns of a 2 x K matrix
+_DBF_TEST_BATCH = """
+function(m, labels, n) {
+    labels <- matrix(labels, nrow = n)
+    vapply(seq_len(ncol(labels)), function(i) {
+        result <- DBF.test(m, labels[, i], n)
+        c(result[["dbf.statistic"]], result[["dbf.p.value"]])
+    }, numeric(2))
+}
+"""
+
+# Maximum number of sites tested per call to `_DBF_TEST_BATCH`; this bounds the number
+# of sites that are re-tested when locating a failing site
+_DBF_TEST_SITES = 100
+
+# Genotypes are passed to R as 32 bit integers, but are encoded as single bytes that
+# are written to the low-order byte of each integer; the remaining bytes are zero
+_INT_LOW_BYTE = 0 if sys.byteorder == "little" else 3
+
+
 # This class groups (read-only) data that is initialized prior to the creation of the
 # worker processes and is thereby implicitly shared between the workers
 class GlobalState:
     # Command-line arguments
     Args: ClassVar[Args]
-    # Row-ordered values from the distance matrix
-    MatrixValues: ClassVar[tuple[float, ...]]
-    # Samples in the distance matrix and the corresponding column in the VCF
-    Samples: ClassVar[tuple[VCFSample, ...]]
+    # Row-ordered values from the distance matrix. Stored as a flat array of doubles,
+    # so that the values can be shared between (forked) workers without being touched
+    # by reference counting and can be copied into R without boxing each value
+    MatrixValues: ClassVar[array.array[float]]
+    # Samples in the distance matrix, as recorded in and ordered by the VCF. Names and
+    # columns are stored separately, since only the columns are used per site
+    SampleNames: ClassVar[tuple[str, ...]]
+    # 0-based column in the VCF file (starting at 9) for each sample in `SampleNames`
+    SampleColumns: ClassVar[tuple[int, ...]]
 
 
 # This state is initialized once per worker and then re-used in subsequent calls
 class WorkerState:
     # Distance matrix converted to an R `matrix` object
     Matrix: ClassVar[object] = None
-    # The `DBF.Test` R function
+    # R function running `DBF.Test` for one or more sites; see `_DBF_TEST_BATCH`
     DBFTestFunc: ClassVar[Any] = None
+    # Number of samples as an R integer vector
+    NSamples: ClassVar[Any] = None
+    # Pre-allocated R vector of group labels, updated in-place for each site
+    GroupLabels: ClassVar[Any] = None
+    # Writable view of the low-order byte of each value in `GroupLabels`
+    GroupLabelsView: ClassVar[memoryview] = memoryview(b"")
+    # Index of `GlobalState.SampleColumns` among the sample columns in the VCF
+    SampleIndices: ClassVar[tuple[int, ...]] = ()
+    # Selects `SampleIndices` from a sequence; None if there are less than two samples
+    SampleGetter: ClassVar[operator.itemgetter[tuple[int, ...]] | None] = None
+    # FORMAT column of the most recent site with a GT field, and the index of GT in it
+    LastFormat: ClassVar[bytes | None] = None
+    LastFormatGTIndex: ClassVar[int] = -1
+
+
+# A batch of VCF records sent to a worker process
+class Batch(NamedTuple):
+    # Number of VCF records read, including records filtered in the main process
+    records: int
+    # VCF records to be processed by the worker
+    lines: list[bytes]
+
+
+# Results for a batch of VCF records
+class BatchResults(NamedTuple):
+    # Number of VCF records read, including records filtered in the main process
+    records: int
+    # Results for each processed record; terminated early on errors
+    results: list[WorkerError | DBFResults]
 
 
 class Worker:
     @classmethod
-    def process(cls, line: bytes) -> WorkerError | DBFResults:
+    def process(cls, batch: Batch) -> BatchResults:
+        results: list[WorkerError | DBFResults] = []
+        # Index in `results` and genotypes of sites to be tested using DBF.test
+        pending: list[tuple[int, bytes]] = []
+
         try:
             # Handling initialization errors is easier in the main function
             cls._initialize_r()
 
-            return cls._work(line)
+            for line in batch.lines:
+                result, genotypes = cls._work(line)
+                if genotypes is not None:
+                    pending.append((len(results), genotypes))
+
+                results.append(result)
+
+                # Sites are tested in groups as they are parsed, so that a failing test
+                # stops processing of the batch before the remaining sites are parsed
+                if len(pending) >= _DBF_TEST_SITES:
+                    if not cls._run_dbf_tests(results, pending):
+                        return BatchResults(records=batch.records, results=results)
+
+                    pending.clear()
         except WorkerError as error:
-            return error
+            # Sites preceding the invalid site are tested first, to preserve ordering
+            if not pending or cls._run_dbf_tests(results, pending):
+                results.append(error)
+
+            return BatchResults(records=batch.records, results=results)
+
+        if pending:
+            cls._run_dbf_tests(results, pending)
+
+        return BatchResults(records=batch.records, results=results)
 
     @classmethod
     def _initialize_r(cls) -> None:
@@ -153,35 +314,56 @@ class Worker:
         signal.signal(signal.SIGINT, signal.SIG_IGN)
 
         cls._setup_r_objects()
+        cls._setup_parser()
 
     @classmethod
     def _setup_r_objects(cls) -> None:
         # robjects must be loaded after initialization, since importing it implicitly
         # initializes the embedded R in the worker process, preventing sanity checks
+        import rpy2.rinterface
         import rpy2.robjects
 
         if WorkerState.Matrix is None:
-            values = rpy2.robjects.FloatVector(GlobalState.MatrixValues)
+            values = rpy2.rinterface.FloatSexpVector.from_memoryview(
+                memoryview(GlobalState.MatrixValues)
+            )
             WorkerState.Matrix = rpy2.robjects.r.matrix(
                 values,
-                nrow=len(GlobalState.Samples),
+                nrow=len(GlobalState.SampleNames),
                 byrow=True,
             )
 
         if WorkerState.DBFTestFunc is None:
             rpy2.robjects.r.source(os.fspath(GlobalState.Args.dbf_test_script))
-            WorkerState.DBFTestFunc = rpy2.robjects.r("DBF.test")
+            # R objects used per site are created using rinterface, so that calls to R
+            # bypass the conversion of arguments and return values done by robjects
+            WorkerState.DBFTestFunc = rpy2.rinterface.evalr(_DBF_TEST_BATCH)
+            WorkerState.NSamples = rpy2.rinterface.IntSexpVector(
+                [len(GlobalState.SampleNames)]
+            )
+
+        if WorkerState.GroupLabels is None:
+            labels = rpy2.rinterface.IntSexpVector([0] * len(GlobalState.SampleNames))
+            WorkerState.GroupLabels = labels
+            view = labels.memoryview().cast("B")
+            WorkerState.GroupLabelsView = view[_INT_LOW_BYTE::4]
 
     @classmethod
-    def _work(cls, line: bytes) -> DBFResults:
-        import rpy2.rinterface_lib.embedded
-        import rpy2.robjects
+    def _setup_parser(cls) -> None:
+        indices = tuple(column - 9 for column in GlobalState.SampleColumns)
+        WorkerState.SampleIndices = indices
+        # itemgetter returns a single value, rather than a tuple, for a single index
+        if len(indices) > 1:
+            WorkerState.SampleGetter = operator.itemgetter(*indices)
 
-        statistic: float | str | None = None
-        p_value: float = 1.0
-        columns = line.rstrip().split(b"\t")
+    @classmethod
+    def _work(cls, line: bytes) -> tuple[DBFResults, bytes | None]:
+        # Returns the results for a site, along with the genotypes for the site if it
+        # is to be tested using DBF.test. Tests are run for groups of sites at once
+        # The sample columns are left as a single value, to allow faster processing
+        columns = line.rstrip().split(b"\t", 9)
         info = cls._parse_info(columns)
-        genotypes: list[int] | None = None
+        genotypes: bytes | None = None
 
         if (
             info is not None
@@ -189,30 +371,8 @@ class Worker:
             and info.maf >= GlobalState.Args.min_maf
         ):
             genotypes = cls._build_group_labels_vec(columns)
-            if genotypes is not None and len(set(genotypes)) > 1:
-                group_labels = rpy2.robjects.IntVector(genotypes)
 
-                try:
-                    # Workaround for bug in CRAN version of DBF_test; n is accessed
-                    # before being set to the number of samples
-                    rpy2.robjects.globalenv["n"] = len(genotypes)
-
-                    # Returns a float-vector with two values
-                    vector = WorkerState.DBFTestFunc(
-                        WorkerState.Matrix,
-                        group_labels,
-                        len(GlobalState.Samples),
-                    )
-
-                    result: dict[str, float] = dict(
-                        zip(vector.names, vector, strict=True)
-                    )
-                    statistic = result["dbf.statistic"]
-                    p_value = result["dbf.p.value"]
-                except rpy2.rinterface_lib.embedded.RRuntimeError as error:
-                    raise WorkerError(f"Error running DBF.test: {error}") from error
-
-        return {
+        result: DBFResults = {
             "CHROM": columns[0].decode(),
             "POS": int(columns[1]),
             "SNP": columns[2].decode(),
@@ -221,65 +381,177 @@ class Worker:
             "A2_FREQ": cls._af2_freq(genotypes),
             "ALL_MAF": "NA" if info is None else info.maf,
             "R2": "NA" if info is None else info.r2,
-            "STAT": statistic,
-            "P": p_value,
+            "STAT": None,
+            "P": 1.0,
         }
 
+        # Sites where all samples share the same genotype are not tested. Uniformity is
+        # checked by comparing with a repeated genotype, which is done by C-level memset
+        # and memcmp calls, rather than by iterating over (boxed) genotypes via min/max
+        if genotypes is None or genotypes == genotypes[:1] * len(genotypes):
+            return result, None
+
+        return result, genotypes
+
     @classmethod
-    def _af2_freq(cls, genotypes: list[int] | None) -> float | str:
-        return "NA" if genotypes is None else (sum(genotypes) / (2 * len(genotypes)))
+    def _run_dbf_tests(
+        cls,
+        results: list[WorkerError | DBFResults],
+        pending: list[tuple[int, bytes]],
+    ) -> bool:
+        # Updates `results` with the DBF.test results for each pending site. On error,
+        # `results` is truncated at the failing site and ends with the error
+        try:
+            statistics = cls._dbf_test([genotypes for _, genotypes in pending])
+        except WorkerError as error:
+            if len(pending) == 1:
+                idx, _ = pending[0]
+                del results[idx:]
+                results.append(error)
+                return False
+
+            # The sites are split and re-tested to locate the failing site, so that the
+            # error is reported for that site and the preceding results are kept
+            middle = len(pending) // 2
+            if not cls._run_dbf_tests(results, pending[:middle]):
+                return False
+
+            return cls._run_dbf_tests(results, pending[middle:])
+
+        for (idx, _), (statistic, p_value) in zip(pending, statistics, strict=True):
+            result = results[idx]
+            assert not isinstance(result, WorkerError)
+            result["STAT"] = statistic
+            result["P"] = p_value
+
+        return True
 
     @classmethod
-    def _parse_info(cls, columns: list[bytes]) -> SiteInfo | None:
-        maf: float | None = None
-        r2: float | None = None
+    def _dbf_test(cls, sites: list[bytes]) -> list[tuple[float, float]]:
+        # Returns the DBF.test statistic and p-value for the genotypes of each site
+        import rpy2.rinterface
+        import rpy2.rinterface_lib.embedded
+
+        if len(sites) == 1:
+            # Labels are copied into the existing R vector, to avoid allocating a new R
+            # vector for every site
+            WorkerState.GroupLabelsView[:] = sites[0]
+            labels = WorkerState.GroupLabels
+        else:
+            # Genotypes are written to a zero-initialized N x K matrix
+            stride = 4 * len(GlobalState.SampleNames)
+            buffer = array.array("i", bytes(stride * len(sites)))
+            buffer_view = memoryview(buffer).cast("B")
+            starts = range(_INT_LOW_BYTE, len(buffer_view), stride)
+            for start, genotypes in zip(starts, sites, strict=True):
+                buffer_view[start : start + stride : 4] = genotypes
+
+            labels = rpy2.rinterface.IntSexpVector.from_memoryview(memoryview(buffer))
 
         try:
-            for field in columns[7].split(b";"):
-                if field.startswith(b"MAF="):
-                    maf = float(field[4:])
-                elif field.startswith(b"R2="):
-                    r2 = float(field[3:])
-        except ValueError:
-            return cls._on_error("Invalid INFO field", columns, columns[7])
+            # Workaround for bug in CRAN version of DBF_test; n is accessed before being
+            # set to the number of samples
+            rpy2.rinterface.globalenv["n"] = WorkerState.NSamples
+
+            # Returns a 2 x K matrix of statistics and p-values, read in column order
+            values = list(
+                WorkerState.DBFTestFunc(
+                    WorkerState.Matrix,
+                    labels,
+                    WorkerState.NSamples,
+                )
+            )
+        except rpy2.rinterface_lib.embedded.RRuntimeError as error:
+            raise WorkerError(f"Error running DBF.test: {error}") from error
+
+        return list(zip(values[0::2], values[1::2], strict=True))
 
+    @classmethod
+    def _af2_freq(cls, genotypes: bytes | None) -> float | str:
+        return "NA" if genotypes is None else (sum(genotypes) / (2 * len(genotypes)))
+
+    @classmethod
+    def _parse_info(cls, columns: list[bytes]) -> SiteInfo | None:
+        maf = _find_info_value(columns[7], b"MAF=")
+        r2 = _find_info_value(columns[7], b"R2=")
         if maf is None or r2 is None:
             return cls._on_error("Missing MAF or R2", columns, columns[7])
 
-        return SiteInfo(maf=maf, r2=r2)
+        try:
+            return SiteInfo(maf=float(maf), r2=float(r2))
+        except ValueError:
+            return cls._on_error("Invalid INFO field", columns, columns[7])
 
     @classmethod
-    def _build_group_labels_vec(cls, columns: list[bytes]) -> list[int] | None:
-        groups = {
-            b"0|0": 0,
-            b"0|1": 1,
-            b"1|0": 1,
-            b"1|1": 2,
-            b"0/0": 0,
-            b"0/1": 1,
-            b"1/0": 1,
-            b"1/1": 2,
-        }
+    def _build_group_labels_vec(cls, columns: list[bytes]) -> bytes | None:
+        # The FORMAT column is typically the same for every site and is therefore only
+        # parsed when it differs from the previous site
+        if columns[8] != WorkerState.LastFormat:
+            info_field_labels = columns[8].split(b":")
+            if b"GT" not in info_field_labels:
+                return cls._on_error("No GT field in INFO column", columns, columns[8])
+
+            WorkerState.LastFormat = columns[8]
+            WorkerState.LastFormatGTIndex = info_field_labels.index(b"GT")
+
+        gt_field_index = WorkerState.LastFormatGTIndex
+
+        # Genotypes are decoded into one byte per sample. Where possible, the decoding
+        # is done by C-level builtins, to avoid running Python bytecode per sample
+        sample_indices = WorkerState.SampleIndices
+        sample_getter = WorkerState.SampleGetter
+        if columns[8] == b"GT" and sample_getter is not None:
+            genotypes = _decode_gt_block(columns[9])
+            if genotypes is not None:
+                # Select samples, unless every sample column in the VCF is used
+                n_samples = len(sample_indices)
+                if len(genotypes) == n_samples and sample_indices[-1] == n_samples - 1:
+                    return genotypes
 
-        info_field_labels = columns[8].split(b":")
-        if b"GT" not in info_field_labels:
-            return cls._on_error("No GT field in INFO column", columns, columns[8])
-        gt_field_index = info_field_labels.index(b"GT")
-
-        group_labels: list[int] = []
-        for sample in GlobalState.Samples:
-            info_fields = columns[sample.column].split(b":", gt_field_index + 1)
+                try:
+                    return bytes(sample_getter(genotypes))
+                except IndexError:
+                    pass
+
+        # Otherwise the GT sub-field of each sample is looked up in `_GT_GROUPS`
+        groups = _GT_GROUPS
+        # Sample columns following the last used sample are left unsplit
+        values = columns[9].split(b"\t", sample_indices[-1] + 1)
+        maxsplit = gt_field_index + 1
+        try:
+            return bytes(
+                [
+                    groups[values[idx].split(b":", maxsplit)[gt_field_index]]
+                    for idx in sample_indices
+                ]
+            )
+        except (IndexError, KeyError):
+            return cls._on_bad_genotype(columns, values, gt_field_index)
 
-            gt = info_fields[gt_field_index]
-            encoded_gt = groups.get(gt)
-            if encoded_gt is None:
-                return cls._on_error(f"Bad genotype for {sample.name}", columns, gt)
+    @classmethod
+    def _on_bad_genotype(
+        cls,
+        columns: list[bytes],
+        values: list[bytes],
+        gt_field_index: int,
+    ) -> None:
+        # Reports the first sample causing an IndexError/KeyError when decoding GTs
+        for name, idx in zip(
+            GlobalState.SampleNames, WorkerState.SampleIndices, strict=True
+        ):
+            if idx >= len(values):
+                return cls._on_error(f"Missing column for {name}", columns, b"")
 
-            group_labels.append(encoded_gt)
+            fields = values[idx].split(b":")
+            if gt_field_index >= len(fields):
+                return cls._on_error(f"Missing GT for {name}", columns, values[idx])
 
-        assert len(group_labels) == len(GlobalState.Samples)
+            if fields[gt_field_index] not in _GT_GROUPS:
+                return cls._on_error(
+                    f"Bad genotype for {name}", columns, fields[gt_field_index]
+                )
 
-        return group_labels
+        return None
 
     @classmethod
     def _on_error(cls, message: str, columns: list[bytes], value: bytes) -> None:
@@ -299,6 +571,122 @@ class Worker:
             )
 
 
+def _is_filtered_site(line: bytes, min_r2: float, min_maf: float) -> bool:
+    # Locate the INFO column without splitting the entire line
+    start = 0
+    for _ in range(7):
+        start = line.find(b"\t", start) + 1
+        if not start:
+            return False
+
+    end = line.find(b"\t", start)
+    if end < 0:
+        return False
+
+    maf = _find_info_value(line, b"MAF=", start, end)
+    r2 = _find_info_value(line, b"R2=", start, end)
+    if maf is None or r2 is None:
+        return False
+
+    try:
+        return not (float(r2) > min_r2 and float(maf) >= min_maf)
+    except ValueError:
+        return False
+
+
+def _read_batches(
+    handle: IO[bytes],
+    args: Args,
+    batch_size: int = 2_000_000,
+    batch_sites: int = 200,
+) -> Iterator[Batch]:
+    # Records are sent to workers in batches of (approximately) `batch_size` bytes, to
+    # amortize the cost of pickling and IPC over many, small records. Batches are also
+    # limited to `batch_sites` sites, since every site in a batch is tested using R,
+    # to ensure that work is spread evenly across workers
+    records = 0
+    batch: list[bytes] = []
+    batch_bytes = 0
+    for line in read_lines(handle):
+        records += 1
+
+        # Sites failing the MAF/R2 filters do not produce any output and are therefore
+        # not sent to the workers. Invalid sites are left for the workers to report
+        if _is_filtered_site(line, args.min_r2, args.min_maf):
+            continue
+
+        batch.append(line)
+        batch_bytes += len(line)
+
+        if batch_bytes >= batch_size or len(batch) >= batch_sites:
+            yield Batch(records=records, lines=batch)
+            records = 0
+            batch = []
+            batch_bytes = 0
+
+    if records:
+        yield Batch(records=records, lines=batch)
+
+
+def _iter_results(
+    batches: Iterable[BatchResults],
+) -> Iterator[WorkerError | DBFResults]:
+    records = 0
+    next_report = 100_000
+    for batch in batches:
+        yield from batch.results
+
+        records += batch.records
+        if records >= next_report and batch.results:
+            last_result = batch.results[-1]
+            if not isinstance(last_result, WorkerError):
+                _info(
+                    "Processed %s records; now at position %s",
+                    f"{records:,}",
+                    last_result["SNP"],
+                )
+
+                next_report = (records // 100_000 + 1) * 100_000
+
+
+def _format_row(values: Iterable[object]) -> bytes:
+    return ("\t".join(map(str, values)) + "\n").encode()
+
+
+def _set_global_state(
+    args: Args,
+    sample_names: tuple[str, ...],
+    sample_columns: tuple[int, ...],
+    values: array.array[float],
+) -> None:
+    GlobalState.Args = args
+    GlobalState.SampleNames = sample_names
+    GlobalState.SampleColumns = sample_columns
+    GlobalState.MatrixValues = values
+
+
+def _create_pool(threads: int) -> multiprocessing.pool.Pool:
+    # Workers are forked on Linux, so that the read-only GlobalState is shared
+    # copy-on-write rather than pickled and sent to every worker. Fork is requested
+    # explicitly, since it is not the default for all Python versions (e.g. 3.14).
+    # This requires that the main process has not started any other threads
+    if sys.platform == "linux":
+        return multiprocessing.get_context("fork").Pool(threads)
+
+    # Forking is unsafe on other platforms (e.g. macOS), where workers are spawned from
+    # a fresh interpreter instead, and where GlobalState must therefore be resent
+    return multiprocessing.get_context("spawn").Pool(
+        threads,
+        initializer=_set_global_state,
+        initargs=(
+            GlobalState.Args,
+            GlobalState.SampleNames,
+            GlobalState.SampleColumns,
+            GlobalState.MatrixValues,
+        ),
+    )
+
+
 def main(argv: list[str] = sys.argv[1:]) -> int:
     args = Args.parse(argv)
 
@@ -347,10 +735,13 @@ def main(argv: list[str] = sys.argv[1:]) -> int:
         samples = sorted(matrix.samples, key=lambda it: vcf_columns[it])
 
         # Set (read-only) variables shared between worker processes
-        GlobalState.Args = args
-        GlobalState.Samples = tuple(VCFSample(key, vcf_columns[key]) for key in samples)
-        GlobalState.MatrixValues = matrix.to_tuple(sample_order=samples)
-        assert len(GlobalState.MatrixValues) == len(GlobalState.Samples) ** 2
+        _set_global_state(
+            args=args,
+            sample_names=tuple(samples),
+            sample_columns=tuple(vcf_columns[key] for key in samples),
+            values=matrix.to_array(sample_order=samples),
+        )
+        assert len(GlobalState.MatrixValues) == len(GlobalState.SampleNames) ** 2
 
         columns = ("SNP", "A1", "A2", "A2_FREQ", "ALL_MAF", "R2", "STAT", "P")
         if args.positions:
@@ -358,28 +749,25 @@ def main(argv: list[str] = sys.argv[1:]) -> int:
 
         head = float("inf") if args.head is None else args.head
 
+        # Rows are written as bytes directly to the underlying buffer, bypassing the
+        # per-call formatting and locking done by `print` and the text-layer
+        out = sys.stdout.buffer
+
         try:
-            print(*columns, sep="\t")
+            out.write(_format_row(columns))
             if head <= 0:
                 return 0
 
-            with multiprocessing.Pool(args.threads) as pool:
-                for idx, result in enumerate(
-                    pool.imap(Worker.process, handle, chunksize=max(10, args.threads))
-                ):
+            with _create_pool(args.threads) as pool:
+                # Batches are processed in order, so that output order matches the VCF
+                batches = pool.imap(Worker.process, _read_batches(handle, args))
+                for result in _iter_results(batches):
                     if isinstance(result, WorkerError):
                         _error("%s", result)
                         break
 
-                    if idx % 100_000 == 0 and idx:
-                        _info(
-                            "Processed %s records; now at position %s",
-                            f"{idx:,}",
-                            result["SNP"],
-                        )
-
                     if result["STAT"] is not None:
-                        print(*(result[key] for key in columns), sep="\t")
+                        out.write(_format_row([result[key] for key in columns]))
 
                         head -= 1
                         if head <= 0:
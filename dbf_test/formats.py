@@ -21,22 +21,123 @@
 #
 from __future__ import annotations
 
+import array
+import csv
 from dataclasses import dataclass
 from typing import (
     IO,
     TYPE_CHECKING,
 )
 
-from dbf_test.utils import abort, quote, read_csv
+from dbf_test.utils import (
+    abort,
+    collect_duplicates,
+    open_rb,
+    quote,
+    read_csv,
+    read_csv_rows,
+)
 
 if TYPE_CHECKING:
     from pathlib import Path
 
 
+try:
+    # pyarrow parses CSV files in a fraction of the time used by the csv module, which
+    # is significant for large distance matrices, but pyarrow is not required
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+
+    def _read_matrix_pyarrow(
+        filepath: Path,  # noqa: ARG001
+    ) -> tuple[tuple[str, ...], dict[str, array.array[float]]] | None:
+        return None
+
+else:
+
+    def _read_matrix_pyarrow(
+        filepath: Path,
+    ) -> tuple[tuple[str, ...], dict[str, array.array[float]]] | None:
+        # Returns None if the file could not be parsed by pyarrow, in which case the
+        # file is re-read using the csv module, in order to report the exact problem
+        with open_rb(filepath) as handle:
+            line = handle.readline()
+            header = next(csv.reader([line.decode()]), None)
+            if header is None or len(header) < 2:
+                return None
+
+            # Blocks span many rows, since per-block overhead is high for wide tables
+            block_size = max(1 << 20, 1024 * len(line))
+
+            # Columns are named by index, since the header may contain duplicate names
+            names = [str(idx) for idx in range(len(header))]
+            types = {name: pa.float64() for name in names[1:]}
+            types[names[0]] = pa.string()
+
+            try:
+                table = pa_csv.read_csv(
+                    handle,
+                    read_options=pa_csv.ReadOptions(
+                        column_names=names,
+                        block_size=block_size,
+                        # Worker processes are forked after the matrix is loaded, so
+                        # pyarrow's CPU thread pool is not used, to avoid forking while
+                        # threads may hold locks
+                        use_threads=False,
+                    ),
+                    # Empty lines are kept, so that they are reported by the csv module
+                    parse_options=pa_csv.ParseOptions(ignore_empty_lines=False),
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types=types,
+                        null_values=[],
+                        strings_can_be_null=False,
+                        quoted_strings_can_be_null=False,
+                    ),
+                )
+            except pa.ArrowInvalid:
+                return None
+
+        if not table.num_rows:
+            return None
+
+        # Columns are transposed into a flat, row-major array using strided copies
+        ncols = len(header) - 1
+        values: array.array[float] = array.array("d", bytes(8 * table.num_rows * ncols))
+        for idx, column in enumerate(table.columns[1:]):
+            chunk = column.combine_chunks()
+            start = chunk.offset * 8
+            data = memoryview(chunk.buffers()[1])[start : start + len(chunk) * 8]
+
+            column_values: array.array[float] = array.array("d")
+            column_values.frombytes(data)
+            values[idx::ncols] = column_values
+
+        columns = tuple(header[1:])
+        duplicates = collect_duplicates(columns)
+        if duplicates:
+            abort("Duplicate columns in %s: %s", quote(filepath), ",".join(duplicates))
+
+        row_names: list[str] = table.column(0).to_pylist()
+        duplicates = collect_duplicates(row_names)
+        if duplicates:
+            abort("Duplicate rows in %s: %s", quote(filepath), ",".join(duplicates))
+
+        rows = {
+            name: values[row_idx * ncols : (row_idx + 1) * ncols]
+            for row_idx, name in enumerate(row_names)
+        }
+
+        return columns, rows
+
+
 @dataclass
 class DistanceMatrix:
     samples: tuple[str, ...]
-    matrix: dict[str, dict[str, float]]
+    # Mapping of sample names to row/column indices in `values`
+    index: dict[str, int]
+    # Rows of the distance matrix, with columns in the same order as the rows
+    values: list[array.array[float]]
 
     def replace_names(self, mapping: dict[str, str]) -> None:
         missing_keys = set(self.samples) - set(mapping)
@@ -47,50 +148,51 @@ class DistanceMatrix:
             )
 
         self.samples = tuple(mapping[key] for key in self.samples)
-        self.matrix = {
-            mapping[row_key]: {
-                mapping[column_key]: value for column_key, value in row.items()
-            }
-            for row_key, row in self.matrix.items()
-        }
+        self.index = {mapping[key]: idx for key, idx in self.index.items()}
 
-    def to_tuple(self, sample_order: list[str]) -> tuple[float, ...]:
-        values: list[float] = []
-        for row_key in sample_order:
-            row = self.matrix[row_key]
-            values.extend(row[key] for key in sample_order)
+    def to_array(self, sample_order: list[str]) -> array.array[float]:
+        indices = [self.index[key] for key in sample_order]
 
-        return tuple(values)
+        values: array.array[float] = array.array("d")
+        for row_idx in indices:
+            values.extend(map(self.values[row_idx].__getitem__, indices))
+
+        return values
 
     @staticmethod
     def load(filepath: Path) -> DistanceMatrix:
-        rows: list[dict[str, float]] = []
-        row_names: list[str] = []
+        result = _read_matrix_pyarrow(filepath)
+        if result is None:
+            result = _read_matrix(filepath)
 
-        for linenum, (row_name, row) in enumerate(read_csv(filepath), start=1):
-            row_names.append(row_name)
+        columns, rows = result
+        if set(rows) != set(columns):
+            abort("Mismatch between row and column names in %s", quote(filepath))
 
-            try:
-                rows.append({key: float(value) for key, value in row.items()})
-            except ValueError as error:
-                abort("Invalid value at %s:%i: %s", quote(filepath), linenum, error)
+        return DistanceMatrix(
+            samples=columns,
+            index={name: idx for idx, name in enumerate(columns)},
+            # Rows are re-ordered to match the order of columns
+            values=[rows[name] for name in columns],
+        )
 
-        columns = tuple(rows[0])
-        if set(row_names) != set(columns):
-            abort("Mismatch between row and column names in %s", quote(filepath))
+
+def _read_matrix(
+    filepath: Path,
+) -> tuple[tuple[str, ...], dict[str, array.array[float]]]:
+    rows: dict[str, array.array[float]] = {}
+    columns: tuple[str, ...] = ()
+
+    rows_iter = read_csv_rows(filepath)
+    for linenum, (header, row_name, row) in enumerate(rows_iter, start=1):
+        columns = header
 
         try:
-            matrix = {
-                row_name: {col_name: float(value) for col_name, value in row.items()}
-                for row_name, row in zip(row_names, rows, strict=True)
-            }
+            rows[row_name] = array.array("d", map(float, row))
         except ValueError as error:
-            abort("Invalid value %s in %s", error, quote(filepath))
+            abort("Invalid value at %s:%i: %s", quote(filepath), linenum, error)
 
-        return DistanceMatrix(
-            samples=columns,
-            matrix=matrix,
-        )
+    return columns, rows
 
 
 def read_name_mapping(
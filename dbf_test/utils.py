@@ -118,15 +118,44 @@ def open_rb(filepath: Path) -> IO[bytes]:
         raise
 
 
+def read_lines(handle: IO[bytes], bufsize: int = 1 << 20) -> Iterator[bytes]:
+    """Yields lines, without trailing newlines, from a binary file handle. Compressed
+    data is read in large blocks, to avoid the overhead of calling `IGzipFile.readline`
+    for every line. Uncompressed files are read line by line, since line iteration is
+    already implemented in C for regular file handles."""
+    if not isinstance(handle, IGzipFile):
+        for line in handle:
+            yield line.rstrip(b"\n")
+
+        return
+
+    tail = b""
+    while block := handle.read(bufsize):
+        lines = (tail + block).split(b"\n")
+        tail = lines.pop()
+
+        yield from lines
+
+    if tail:
+        yield tail
+
+
 def open_rt(filepath: Path) -> IO[str]:
     return io.TextIOWrapper(open_rb(filepath))
 
 
 def read_csv(filepath: Path) -> Iterator[tuple[str, dict[str, str]]]:
+    for columns, row_name, row in read_csv_rows(filepath):
+        yield row_name, dict(zip(columns, row, strict=True))
+
+
+def read_csv_rows(filepath: Path) -> Iterator[tuple[tuple[str, ...], str, list[str]]]:
+    """Reads a CSV file with row and column names, yielding tuples of column names,
+    the row name, and the (unnamed) values in that row."""
     with open_rt(filepath) as handle:
         reader = csv.reader(handle)
         try:
-            columns = next(reader)[1:]
+            columns = tuple(next(reader)[1:])
         except StopIteration:
             abort("CSV file is empty: %s", quote(filepath))
 
@@ -135,7 +164,7 @@ def read_csv(filepath: Path) -> Iterator[tuple[str, dict[str, str]]]:
             if len(row) != len(columns) + 1:
                 abort("Wrong number of columns at %s:%i", quote(filepath), linenum)
 
-            yield row[0], dict(zip(columns, row[1:], strict=True))
+            yield columns, row[0], row[1:]
             row_names.append(row[0])
 
         if not row_names:
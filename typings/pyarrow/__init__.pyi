@@ -0,0 +1,28 @@
+from collections.abc import Sequence
+from typing import Any
+
+class ArrowInvalid(ValueError): ...  # noqa: N818
+class DataType: ...
+
+class Buffer:
+    def __buffer__(self, flags: int, /) -> memoryview: ...
+
+class Array:
+    @property
+    def offset(self) -> int: ...
+    def __len__(self) -> int: ...
+    def buffers(self) -> list[Buffer]: ...
+
+class ChunkedArray:
+    def combine_chunks(self) -> Array: ...
+    def to_pylist(self) -> list[Any]: ...
+
+class Table:
+    @property
+    def columns(self) -> Sequence[ChunkedArray]: ...
+    @property
+    def num_rows(self) -> int: ...
+    def column(self, i: int) -> ChunkedArray: ...
+
+def float64() -> DataType: ...
+def string() -> DataType: ...
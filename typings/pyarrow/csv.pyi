@@ -0,0 +1,34 @@
+from collections.abc import Mapping, Sequence
+from typing import IO
+
+from pyarrow import DataType, Table
+
+class ReadOptions:
+    def __init__(
+        self,
+        *,
+        use_threads: bool = ...,
+        column_names: Sequence[str] = ...,
+        block_size: int = ...,
+    ) -> None: ...
+
+class ParseOptions:
+    def __init__(self, *, ignore_empty_lines: bool = ...) -> None: ...
+
+class ConvertOptions:
+    def __init__(
+        self,
+        *,
+        column_types: Mapping[str, DataType] = ...,
+        null_values: Sequence[str] = ...,
+        strings_can_be_null: bool = ...,
+        quoted_strings_can_be_null: bool = ...,
+    ) -> None: ...
+
+def read_csv(
+    input_file: IO[bytes],
+    *,
+    read_options: ReadOptions = ...,
+    parse_options: ParseOptions = ...,
+    convert_options: ConvertOptions = ...,
+) -> Table: ...
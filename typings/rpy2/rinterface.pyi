@@ -1 +1,21 @@
+from collections.abc import Sequence
+
 def initr_simple() -> int | None: ...
+def evalr(source: str) -> Sexp: ...
+
+class Sexp: ...
+
+class SexpEnvironment(Sexp):
+    def __setitem__(self, key: str, value: Sexp) -> None: ...
+
+globalenv: SexpEnvironment
+
+class FloatSexpVector(Sexp):
+    @classmethod
+    def from_memoryview(cls, mview: memoryview) -> FloatSexpVector: ...
+
+class IntSexpVector(Sexp):
+    def __init__(self, obj: Sequence[int]) -> None: ...
+    @classmethod
+    def from_memoryview(cls, mview: memoryview) -> IntSexpVector: ...
+    def memoryview(self) -> memoryview: ...
@@ -1,12 +1,14 @@
 from collections.abc import MutableMapping, Sequence
 
+from rpy2.rinterface import FloatSexpVector
+
 globalenv: MutableMapping[str, object]
 
 class _R:
     def __call__(self, key: str) -> object: ...
     def matrix(
         self,
-        obj: FloatVector,
+        obj: FloatVector | FloatSexpVector,
         *,
         nrow: int = ...,
         ncol: int = ...,